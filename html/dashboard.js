@@ -75,7 +75,7 @@ class PipelineDashboard {
       if (response.ok) {
         const data = await response.json();
         this.summary = data.summary || [];
-        this.rawData = data.raw || [];
+        this.rawData = this.decodeRawData(data.raw);
       } else {
         // Fallback to embedded data if available
         if (typeof SUMMARY !== 'undefined' && typeof RAW !== 'undefined') {
@@ -94,6 +94,18 @@ class PipelineDashboard {
     }
   }
 
+  decodeRawData(raw) {
+    // data.json stores raw records column-wise: { columns: [...], rows: [[...], ...] }
+    if (!raw) return [];
+    if (Array.isArray(raw)) return raw;
+    const columns = raw.columns || [];
+    return (raw.rows || []).map(row => {
+      const record = {};
+      columns.forEach((column, i) => { record[column] = row[i]; });
+      return record;
+    });
+  }
+
   async loadSystemInfo() {
     try {
       const response = await fetch('system_info.json');
@@ -4,19 +4,26 @@
 from __future__ import annotations
 import csv
 import json
-import re
-from dataclasses import dataclass, asdict
-from collections import defaultdict
+import os
+from dataclasses import dataclass, field, fields
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from statistics import mean
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 ROOT = Path(__file__).resolve().parent.parent
 RESULTS = ROOT / "results"
 HTML_DIR = Path(__file__).resolve().parent
 DATA_JSON = HTML_DIR / "data.json"
-CSV_PATTERN = re.compile(r"e2e-edge-pipeline_.*\.csv$")
+CSV_PREFIX = "e2e-edge-pipeline_"
+CSV_SUFFIX = ".csv"
+MAX_PARSE_WORKERS = 32
 
-@dataclass
+@dataclass(slots=True)
 class Record:
     timestamp: str
     system: str
@@ -28,7 +35,7 @@ class Record:
     batch: str
     throughput: float | None
     per_stream: float | None
-    theoretical: str
+    theoretical: float | None
     streams: str
     pipeline: str
     device_config: str | None = None
@@ -36,116 +43,177 @@ class Record:
     efficiency: float | None = None
 
 
+RECORD_FIELDS = tuple(f.name for f in fields(Record))
+
+
 def parse_float(value: str | None) -> float | None:
     """Parse float field, returning None for NA/missing values."""
     return float(value) if value and value.upper() != 'NA' else None
 
 
+def parse_theoretical(value: str) -> float | None:
+    """Parse theoretical stream density, returning None if not numeric."""
+    try:
+        if value and value.lower() not in {"na", "nan"}:
+            return float(value)
+    except ValueError:
+        pass
+    return None
+
+
+@lru_cache(maxsize=None)
+def column_index(header: tuple[str, ...]) -> dict[str, int]:
+    """Map each CSV header name to its column position."""
+    return {name: i for i, name in enumerate(header)}
+
+
+def parse_csv(res_file: Path) -> Record | None:
+    """Parse a single benchmark CSV file, returning None if it has no data row."""
+    try:
+        with res_file.open("r", newline="") as fh:
+            # Only the header and first data row are used; stop reading there
+            reader = csv.reader(fh)
+            try:
+                header = next(reader)
+                row = next(reader)
+            except StopIteration:
+                return None
+            
+            # Benchmark CSVs share a header, so its column index is built once
+            idx = column_index(tuple(header))
+            
+            def col(name: str, default: str | None = "") -> str | None:
+                i = idx.get(name)
+                return row[i] if i is not None and i < len(row) else default
+            
+            # Build pipeline string based on available columns
+            if "Pipeline1" in idx and "Pipeline2" in idx:
+                pipeline_data = f"Pipeline1: {col('Pipeline1')}... | Pipeline2: {col('Pipeline2')}..."
+            elif "Pipeline1" in idx:
+                pipeline_data = col("Pipeline1")
+            else:
+                pipeline_data = col("Pipeline")
+            
+            return Record(
+                timestamp=col("Timestamp"),
+                system=col("System"),
+                duration=col("Duration (s)"),
+                cores=col("Cores Pinned"),
+                config=col("Pipeline Config"),
+                detect=col("Detect Device"),
+                classify=col("Classify Device"),
+                batch=col("Batch"),
+                throughput=parse_float(col("Throughput (fps)", None)),
+                per_stream=parse_float(col("Throughput per Stream (fps/#)", None)),
+                theoretical=parse_theoretical(col("Theoretical Stream Density (@30fps±5%)")),
+                streams=col("Measured Stream Density (#)"),
+                pipeline=pipeline_data,
+                device_config=col("Device Configuration", None),
+                avg_power=parse_float(col("Avg Power (W)", None)),
+                efficiency=parse_float(col("Efficiency (FPS/W)", None)),
+            )
+    except Exception as e:
+        print(f"[ Warning ] Failed to parse {res_file.name}: {e}")
+        return None
+
+
 def read_csvs():
     """Read all CSV benchmark files from device-specific subdirectories and return parsed records."""
     records: list[Record] = []
     if not RESULTS.exists():
         return records
     
-    # Scan all subdirectories in results/
-    for devconfig_dir in RESULTS.iterdir():
-        if not devconfig_dir.is_dir():
-            continue
-            
-        print(f"[ Info ] Scanning {devconfig_dir.name}/ for results files...")
-        
-        for res_file in devconfig_dir.iterdir():
-            if not res_file.is_file() or not CSV_PATTERN.search(res_file.name):
+    # Scan all subdirectories in results/. DirEntry caches the file type from
+    # the directory listing, so no extra stat() is needed per entry.
+    res_files: list[Path] = []
+    with os.scandir(RESULTS) as devconfig_dirs:
+        for devconfig_dir in devconfig_dirs:
+            if not devconfig_dir.is_dir(follow_symlinks=False):
                 continue
                 
-            try:
-                with res_file.open("r", newline="") as fh:
-                    rows = list(csv.reader(fh))
-                    if len(rows) < 2:
-                        continue
-                    
-                    # Create dict by zipping header with data row
-                    res_dict = dict(zip(rows[0], rows[1]))
-                    
-                    # Build pipeline string based on available columns
-                    if "Pipeline1" in res_dict and "Pipeline2" in res_dict:
-                        pipeline_data = f"Pipeline1: {res_dict['Pipeline1']}... | Pipeline2: {res_dict['Pipeline2']}..."
-                    elif "Pipeline1" in res_dict:
-                        pipeline_data = res_dict["Pipeline1"]
-                    else:
-                        pipeline_data = res_dict.get("Pipeline", "")
-                    
-                    rec = Record(
-                        timestamp=res_dict.get("Timestamp", ""),
-                        system=res_dict.get("System", ""),
-                        duration=res_dict.get("Duration (s)", ""),
-                        cores=res_dict.get("Cores Pinned", ""),
-                        config=res_dict.get("Pipeline Config", ""),
-                        detect=res_dict.get("Detect Device", ""),
-                        classify=res_dict.get("Classify Device", ""),
-                        batch=res_dict.get("Batch", ""),
-                        throughput=parse_float(res_dict.get("Throughput (fps)")),
-                        per_stream=parse_float(res_dict.get("Throughput per Stream (fps/#)")),
-                        theoretical=res_dict.get("Theoretical Stream Density (@30fps±5%)", ""),
-                        streams=res_dict.get("Measured Stream Density (#)", ""),
-                        pipeline=pipeline_data,
-                        device_config=res_dict.get("Device Configuration"),
-                        avg_power=parse_float(res_dict.get("Avg Power (W)")),
-                        efficiency=parse_float(res_dict.get("Efficiency (FPS/W)")),
-                    )
-                    records.append(rec)
-            except Exception as e:
-                print(f"[ Warning ] Failed to parse {res_file.name}: {e}")
-                continue
+            print(f"[ Info ] Scanning {devconfig_dir.name}/ for results files...")
+            
+            with os.scandir(devconfig_dir.path) as entries:
+                for res_file in entries:
+                    if (res_file.is_file(follow_symlinks=False)
+                            and res_file.name.startswith(CSV_PREFIX)
+                            and res_file.name.endswith(CSV_SUFFIX)):
+                        res_files.append(Path(res_file.path))
+    
+    if not res_files:
+        return records
+    
+    # Parsing is dominated by open/read latency, so overlap it across threads
+    with ThreadPoolExecutor(max_workers=min(MAX_PARSE_WORKERS, len(res_files))) as executor:
+        records = [rec for rec in executor.map(parse_csv, res_files) if rec is not None]
     
     return records
 
 
+@dataclass(slots=True)
+class RunningMean:
+    """Running sum and count of the non-missing values seen so far."""
+    total: float = 0.0
+    count: int = 0
+
+    def add(self, value: float | None) -> None:
+        if value is not None:
+            self.total += value
+            self.count += 1
+
+    def value(self) -> float | None:
+        return self.total / self.count if self.count else None
+
+
+@dataclass(slots=True)
+class GroupStats:
+    """Online aggregate of all records sharing a configuration group."""
+    first: Record
+    runs: int = 0
+    throughput: RunningMean = field(default_factory=RunningMean)
+    theoretical: RunningMean = field(default_factory=RunningMean)
+    avg_power: RunningMean = field(default_factory=RunningMean)
+    efficiency: RunningMean = field(default_factory=RunningMean)
+
+
 def aggregate(records: list[Record]):
-    """Aggregate records by configuration groups."""
-    groups = defaultdict(list)
+    """Aggregate records by configuration groups in a single pass."""
+    groups: dict[tuple[str, str, str], GroupStats] = {}
     for r in records:
         # Use device_config for grouping if available, otherwise fall back to detect/classify
         if r.device_config:
             key = (r.config, r.device_config, r.batch)
         else:
             key = (r.config, f"{r.detect}-{r.classify}", r.batch)
-        groups[key].append(r)
-        
-    summary: list[dict] = []
-    for key, recs in groups.items():
-        cfg, device_desc, batch = key
         
-        # Calculate average throughput
-        thr = [r.throughput for r in recs if r.throughput is not None]
+        # Keep the first record for detect/classify compatibility fields
+        stats = groups.get(key)
+        if stats is None:
+            stats = groups[key] = GroupStats(first=r)
+        stats.runs += 1
+        stats.throughput.add(r.throughput)
+        stats.theoretical.add(r.theoretical)
+        stats.avg_power.add(r.avg_power)
+        stats.efficiency.add(r.efficiency)
         
-        # Calculate average power and efficiency
-        pwr = [r.avg_power for r in recs if r.avg_power is not None]
-        eff = [r.efficiency for r in recs if r.efficiency is not None]
-        
-        # Parse theoretical streams (numeric if possible)
-        theo_vals: list[float] = []
-        for r2 in recs:
-            try:
-                if r2.theoretical and r2.theoretical.lower() not in {"na", "nan"}:
-                    theo_vals.append(float(r2.theoretical))
-            except ValueError:
-                continue
-                
-        # Extract detect/classify from first record for compatibility
-        first_rec = recs[0]
+    summary: list[dict] = []
+    for (cfg, device_desc, batch), stats in groups.items():
+        thr = stats.throughput.value()
+        theo = stats.theoretical.value()
+        pwr = stats.avg_power.value()
+        eff = stats.efficiency.value()
         
         summary.append({
             "config": cfg,
             "device_config": device_desc,
-            "detect": first_rec.detect,
-            "classify": first_rec.classify,
+            "detect": stats.first.detect,
+            "classify": stats.first.classify,
             "batch": batch,
-            "runs": len(recs),
-            "avg_throughput": round(mean(thr), 2) if thr else None,
-            "theoretical_streams": int(round(mean(theo_vals))) if theo_vals else None,
-            "avg_power": round(mean(pwr), 2) if pwr else None,
-            "efficiency": round(mean(eff), 2) if eff else None,
+            "runs": stats.runs,
+            "avg_throughput": round(thr, 2) if thr is not None else None,
+            "theoretical_streams": int(round(theo)) if theo is not None else None,
+            "avg_power": round(pwr, 2) if pwr is not None else None,
+            "efficiency": round(eff, 2) if eff is not None else None,
         })
         
     # Custom config order: light, medium, heavy
@@ -163,11 +231,20 @@ def write_data_json(summary, raw_records):
     """Write the aggregated data to JSON file for the dashboard."""
     data = {
         "summary": summary,
-        "raw": [asdict(r) for r in raw_records],
+        # Column-wise layout avoids repeating every field name per record
+        "raw": {
+            "columns": list(RECORD_FIELDS),
+            "rows": [[getattr(r, name) for name in RECORD_FIELDS] for r in raw_records],
+        },
         "generated": "Generated by generate_report.py",
         "timestamp": str(Path(RESULTS).stat().st_mtime) if RESULTS.exists() else None
     }
     
+    # orjson is optional; fall back to the stdlib encoder when it is not installed
+    if orjson is not None:
+        DATA_JSON.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+        return
+    
     with DATA_JSON.open('w', encoding='utf-8') as f:
         json.dump(data, f, indent=2)
 
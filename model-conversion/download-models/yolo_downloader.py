@@ -2,22 +2,62 @@
 # SPDX-License-Identifier: Apache-2.0
 
 import argparse
+import copy
+import gc
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from pathlib import Path
-from typing import Optional, Union, Dict, Any
-from zipfile import ZipFile
+from typing import TYPE_CHECKING, Callable, Optional, Tuple, Union, Dict, Any
+from zipfile import ZipFile, ZipInfo
 
-import torch
-import openvino as ov
+import numpy as np
 from tqdm import tqdm
-from ultralytics import YOLO
-from ultralytics.utils import DEFAULT_CFG
-from ultralytics.cfg import get_cfg
-from ultralytics.data.converter import coco80_to_coco91_class
-from ultralytics.data.utils import check_det_dataset
-from ultralytics.utils.metrics import ConfusionMatrix
-import nncf
 
-from common import download_file, save_openvino_models, validate_hash
+from common import create_core, download_file, download_files, save_openvino_models, validate_hash
+
+EXTRACT_BUFFER_SIZE = 1 << 20
+# Sweeps up to this many images are compiled with the LATENCY hint
+LATENCY_MAX_SAMPLES = 8
+
+# torch, openvino, ultralytics and nncf take seconds to import, so each stage imports
+# only what it uses and the dataset download does not wait on them
+if TYPE_CHECKING:
+    import openvino as ov
+    import torch
+    from ultralytics import YOLO
+
+
+def extract_zip(
+    zip_path: Path,
+    out_dir: Path,
+    member_filter: Optional[Callable[[str], bool]] = None,
+) -> None:
+    """Extract zip members in parallel, streaming each through 1 MiB buffers."""
+    out_root = Path(out_dir).resolve()
+    with ZipFile(zip_path, "r") as zip_ref:
+        members = []
+        for info in zip_ref.infolist():
+            if info.is_dir() or (member_filter is not None and not member_filter(info.filename)):
+                continue
+            target = (out_root / info.filename).resolve()
+            if not target.is_relative_to(out_root):
+                raise ValueError(f"Refusing to extract {info.filename} outside of {out_root}.")
+            members.append((info, target))
+
+        # Create directories up front so worker threads never race on mkdir
+        for parent in {target.parent for _, target in members}:
+            parent.mkdir(parents=True, exist_ok=True)
+
+        def extract_member(member: Tuple[ZipInfo, Path]) -> None:
+            info, target = member
+            with zip_ref.open(info) as src, open(target, "wb", buffering=EXTRACT_BUFFER_SIZE) as dst:
+                shutil.copyfileobj(src, dst, length=EXTRACT_BUFFER_SIZE)
+
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            list(tqdm(executor.map(extract_member, members), total=len(members), desc=Path(zip_path).name))
 
 
 def download_coco_dataset(dataset_dir: Union[str, Path], scripts_dir: Path) -> Path:
@@ -35,8 +75,10 @@ def download_coco_dataset(dataset_dir: Union[str, Path], scripts_dir: Path) -> P
     cfg_path = scripts_dir / "coco.yaml"
 
     if not (out_dir / "coco/labels").exists():
-        download_file(DATA_URL, data_path.name, data_path.parent)
-        download_file(LABELS_URL, labels_path.name, labels_path.parent)
+        download_files([
+            (DATA_URL, data_path.name, data_path.parent),
+            (LABELS_URL, labels_path.name, labels_path.parent),
+        ])
 
         validate_hash(
             file_path=data_path,
@@ -49,19 +91,17 @@ def download_coco_dataset(dataset_dir: Union[str, Path], scripts_dir: Path) -> P
         )
         
         print("[ Download ] Extracting dataset files.")
-        with ZipFile(labels_path, "r") as zip_ref:
-            # Only extract validation labels, not train/test
-            val_files = [f for f in zip_ref.namelist() if 'val2017' in f or 'labels/val2017' in f]
-            for file in val_files:
-                zip_ref.extract(file, out_dir)
-        with ZipFile(data_path, "r") as zip_ref:
-            zip_ref.extractall(out_dir / "coco/images")
+        # Only extract validation labels, not train/test
+        extract_zip(labels_path, out_dir, lambda name: 'val2017' in name)
+        extract_zip(data_path, out_dir / "coco/images")
     
     return cfg_path
 
 
-def download_yolo(model_name: str, models_dir: Path) -> tuple[Path, YOLO]:
+def download_yolo(model_name: str, models_dir: Path) -> tuple[Path, "YOLO"]:
     """Download YOLO model and test on sample image."""
+    from ultralytics import YOLO
+    
     print(f"\n[ Download ] Downloading YOLO model: {model_name}")
     models_dir.mkdir(exist_ok=True)
     
@@ -85,20 +125,32 @@ def download_yolo(model_name: str, models_dir: Path) -> tuple[Path, YOLO]:
     return det_model_path, det_model
 
 
-def convert_yolo_to_openvino(det_model: YOLO, det_model_path: Path) -> ov.Model:
+def convert_yolo_to_openvino(det_model: "YOLO", det_model_path: Path, core: "ov.Core") -> "ov.Model":
     """Convert YOLO model to OpenVINO IR format."""
     if not det_model_path.exists():
         print("[ Conversion ] Converting YOLO model to OpenVINO format.")
-        det_model.export(format="openvino", dynamic=True, half=True)
+        det_model.export(format="openvino", dynamic=False, imgsz=640, half=True)
     
-    core = ov.Core()
     det_ov_model = core.read_model(det_model_path)
-    det_ov_model.reshape([1, 3, 640, 640])
+    # IRs exported by earlier versions of this script have a dynamic input
+    if det_ov_model.is_dynamic():
+        det_ov_model.reshape([1, 3, 640, 640])
     
     return det_ov_model
 
 
-def setup_validator_and_dataloader(det_model: YOLO, cfg_path: Path, dataset_dir: Union[str, Path]):
+def setup_validator_and_dataloader(
+    det_model: "YOLO",
+    cfg_path: Path,
+    dataset_dir: Union[str, Path],
+    compile_postprocess: bool = False,
+):
+    import torch
+    from ultralytics.cfg import get_cfg
+    from ultralytics.data.converter import coco80_to_coco91_class
+    from ultralytics.data.utils import check_det_dataset
+    from ultralytics.utils import DEFAULT_CFG
+    
     print("\n[ Setup ] Setting up validator and data loader.")
     
     args = get_cfg(cfg=DEFAULT_CFG)
@@ -107,7 +159,23 @@ def setup_validator_and_dataloader(det_model: YOLO, cfg_path: Path, dataset_dir:
     det_validator = det_model.task_map[det_model.task]["validator"](args=args)
     det_validator.data = check_det_dataset(args.data)
     det_validator.stride = 32
-    det_data_loader = det_validator.get_dataloader(Path(dataset_dir) / "coco", 1)
+    det_dataset = det_validator.build_dataset(str(Path(dataset_dir) / "coco"), mode="val", batch=1)
+    
+    # Ultralytics' get_dataloader returns an InfiniteDataLoader, which forks its workers on
+    # construction and whose iterator resumes where the previous pass stopped. A plain loader
+    # restarts each pass on the same images, while persistent workers and deeper prefetching
+    # keep decode + letterbox ahead of inference.
+    workers = min(8, os.cpu_count() or 4)
+    det_data_loader = torch.utils.data.DataLoader(
+        det_dataset,
+        batch_size=1,
+        shuffle=False,
+        num_workers=workers,
+        persistent_workers=True,
+        prefetch_factor=4,
+        pin_memory=False,
+        collate_fn=det_dataset.collate_fn,
+    )
     
     det_validator.is_coco = True
     det_validator.class_map = coco80_to_coco91_class()
@@ -115,45 +183,123 @@ def setup_validator_and_dataloader(det_model: YOLO, cfg_path: Path, dataset_dir:
     det_validator.metrics.names = det_validator.names
     det_validator.nc = det_model.model.model[-1].nc
     
+    if compile_postprocess:
+        # Predictions always have the static [1, 84, 8400] shape, so the NMS prologue can be
+        # compiled once. Dynamo is not thread-safe and postprocess is called from OpenVINO
+        # callback threads, so calls into the compiled function are serialized.
+        compiled_postprocess = torch.compile(det_validator.postprocess, mode="max-autotune", dynamic=False)
+        postprocess_lock = threading.Lock()
+        
+        def postprocess(preds: torch.Tensor):
+            with postprocess_lock:
+                return compiled_postprocess(preds)
+        
+        det_validator.postprocess = postprocess
+    
     return det_validator, det_data_loader
 
 
+def preprocess_batch(batch: Dict[str, Any], out: Optional[np.ndarray] = None) -> Dict[str, Any]:
+    """
+    Scale a collated uint8 image batch to float32 in [0, 1] in a single NumPy pass, writing into
+    out when its shape matches. Stands in for validator.preprocess, whose torch cast and divide
+    take two passes; the label tensors already live on the CPU.
+    """
+    img = batch["img"].numpy()
+    if out is None or out.shape != img.shape:
+        out = np.empty(img.shape, dtype=np.float32)
+    batch["img"] = np.divide(img, np.float32(255), out=out, dtype=np.float32)
+    return batch
+
+
+def reset_validator(validator: Any) -> Any:
+    """Return a shallow copy of the validator with its own empty metric state."""
+    from ultralytics.utils.metrics import DetMetrics
+    
+    model_validator = copy.copy(validator)
+    model_validator.seen = 0
+    model_validator.jdict = []
+    model_validator.stats = dict(tp=[], conf=[], pred_cls=[], target_cls=[], target_img=[])
+    model_validator.batch_i = 1
+    # update_metrics feeds the confusion matrix only when plotting and collects COCO JSON
+    # predictions only when saving them; neither is needed for the summary
+    model_validator.args = copy.copy(validator.args)
+    model_validator.args.plots = False
+    model_validator.args.save_json = False
+    model_validator.confusion_matrix = None
+    model_validator.metrics = DetMetrics(save_dir=validator.save_dir, on_plot=validator.on_plot)
+    model_validator.metrics.names = validator.names
+    return model_validator
+
+
+def compile_for_accuracy(
+    models: Dict[str, "ov.Model"],
+    core: "ov.Core",
+    device: str = "CPU",
+    num_samples: Optional[int] = None,
+) -> Dict[str, "ov.CompiledModel"]:
+    """Compile each labelled model for an accuracy sweep of num_samples images on device."""
+    # A short spot check is latency bound; a full sweep keeps every core busy with the
+    # device's optimal number of streams. None means the whole dataset.
+    if num_samples is not None and num_samples <= LATENCY_MAX_SAMPLES:
+        ov_config = {"PERFORMANCE_HINT": "LATENCY"}
+    else:
+        ov_config = {"PERFORMANCE_HINT": "THROUGHPUT"}
+    if "GPU" in device:
+        ov_config["GPU_DISABLE_WINOGRAD_CONVOLUTION"] = "YES"
+    
+    return {label: core.compile_model(model, device, ov_config) for label, model in models.items()}
+
+
 def test_model_accuracy(
-    model: ov.Model,
-    core: ov.Core,
-    data_loader: torch.utils.data.DataLoader,
+    compiled_models: Dict[str, "ov.CompiledModel"],
+    data_loader: "torch.utils.data.DataLoader",
     validator: Any,
     num_samples: Optional[int] = None,
     device: str = "CPU"
-) -> Dict[str, float]:
+) -> Dict[str, Tuple[Dict[str, float], Any]]:
     """
-    OpenVINO YOLO model accuracy validation function. Runs model validation on dataset and returns metrics
+    OpenVINO YOLO model accuracy validation function. Runs validation of all models on a single
+    pass over the dataset and returns the metrics and validator state of each model by label.
     """
-    print(f"\n[ Accuracy ] Testing model accuracy on {device}.")
+    import openvino as ov
+    import torch
     
-    validator.seen = 0
-    validator.jdict = []
-    validator.stats = dict(tp=[], conf=[], pred_cls=[], target_cls=[], target_img=[])
-    validator.batch_i = 1
-    validator.confusion_matrix = ConfusionMatrix(nc=validator.nc)
+    print(f"\n[ Accuracy ] Testing {', '.join(compiled_models)} model accuracy on {device}.")
     
-    model.reshape({0: [1, 3, 640, 640]})
-    ov_config = {}
-    if "GPU" in device:
-        ov_config = {"GPU_DISABLE_WINOGRAD_CONVOLUTION": "YES"}
-    compiled_model = core.compile_model(model, device, ov_config)
+    # Overlap inference requests with dataloader preprocessing. Callbacks run on
+    # OpenVINO worker threads, so each model's validator updates are serialized with a lock.
+    queues: Dict[str, ov.AsyncInferQueue] = {}
+    validators: Dict[str, Any] = {}
+    for label, compiled_model in compiled_models.items():
+        model_validator = validators[label] = reset_validator(validator)
+        lock = threading.Lock()
+        
+        def on_done(request: ov.InferRequest, batch: dict, model_validator=model_validator, lock=lock) -> None:
+            # Zero-copy view of the request's output buffer; it is only valid until the
+            # request is reused, so it must be consumed before the callback returns.
+            preds = torch.from_numpy(request.get_output_tensor(0).data)
+            with lock:
+                preds = model_validator.postprocess(preds)
+                model_validator.update_metrics(preds, batch)
+        
+        queues[label] = ov.AsyncInferQueue(compiled_model)
+        queues[label].set_callback(on_done)
     
-    for batch_i, batch in enumerate(tqdm(data_loader, total=num_samples)):
-        if num_samples is not None and batch_i == num_samples:
-            break
-        batch = validator.preprocess(batch)
-        results = compiled_model(batch["img"])
-        preds = torch.from_numpy(results[compiled_model.output(0)])
-        preds = validator.postprocess(preds)
-        validator.update_metrics(preds, batch)
+    # islice stops before requesting the next batch, so no extra image is decoded past the end.
+    # start_async copies inputs into the request's own tensor, so one image buffer is reused;
+    # callbacks only read the batch's image shape.
+    total = len(data_loader) if num_samples is None else min(num_samples, len(data_loader))
+    img_buffer = None
+    for batch in tqdm(islice(data_loader, num_samples), total=total):
+        batch = preprocess_batch(batch, img_buffer)
+        img_buffer = batch["img"]
+        for infer_queue in queues.values():
+            infer_queue.start_async(batch["img"], userdata=batch)
+    for infer_queue in queues.values():
+        infer_queue.wait_all()
     
-    stats = validator.get_stats()
-    return stats
+    return {label: (v.get_stats(), v) for label, v in validators.items()}
 
 
 def print_accuracy_stats(stats: Dict[str, float], total_images: int, total_objects: int):
@@ -195,31 +341,39 @@ def print_accuracy_stats(stats: Dict[str, float], total_images: int, total_objec
 
 
 def quantize_yolo_model(
-    fp32_model: ov.Model,
-    data_loader: torch.utils.data.DataLoader,
-    validator: Any,
-    model_name: str,
+    fp32_model: "ov.Model",
+    data_loader: "torch.utils.data.DataLoader",
+    head_idx: int,
+    head_output: str,
     subset_size: int = 512
-) -> ov.Model:
+) -> "ov.Model":
+    import nncf
+    
     print("\n[ Quantization ] Quantizing model to INT8.")
     
-    def transform_fn(data_item: dict):
-        """Quantization transform function. Extracts and preprocess input data from dataloader item for quantization."""
-        input_tensor = validator.preprocess(data_item)['img'].numpy()
-        return input_tensor
-
-    quantization_dataset = nncf.Dataset(data_loader, transform_fn)
+    # NNCF walks the calibration set several times (statistics, bias correction),
+    # so decode and preprocess the subset once up front. Inputs are x/255 of uint8
+    # pixels, which FP16 holds well within calibration noise at half the memory.
+    img_buffer = None
+    calibration_inputs = []
+    for data_item in tqdm(islice(data_loader, subset_size), total=subset_size, desc="Calibration data"):
+        img_buffer = preprocess_batch(data_item, img_buffer)['img']
+        calibration_inputs.append(img_buffer.astype(np.float16))
     
-    # Define ignored scope for post-processing layers
+    def transform_fn(input_tensor: np.ndarray) -> np.ndarray:
+        """Up-cast a cached FP16 input to the FP32 precision of the model input."""
+        return input_tensor.astype(np.float32)
+    
+    quantization_dataset = nncf.Dataset(calibration_inputs, transform_fn)
+    
+    # Define ignored scope for post-processing layers of the detect head, from the per-level
+    # concats to the node feeding the model output
+    concat = f"__module.model.{head_idx}/aten::cat/Concat"
     ignored_scope = nncf.IgnoredScope(
         subgraphs=[
             nncf.Subgraph(
-                inputs=[
-                    f"__module.model.{22 if 'v8' in model_name else 23}/aten::cat/Concat",
-                    f"__module.model.{22 if 'v8' in model_name else 23}/aten::cat/Concat_1",
-                    f"__module.model.{22 if 'v8' in model_name else 23}/aten::cat/Concat_2"
-                ],
-                outputs=[f"__module.model.{22 if 'v8' in model_name else 23}/aten::cat/Concat_7"]
+                inputs=[concat, f"{concat}_1", f"{concat}_2"],
+                outputs=[head_output]
             )
         ]
     )
@@ -241,7 +395,8 @@ def main(
     samples: int = 512,
     subset_size: int = None,
     output_dir: Union[str, Path] = Path("models"),
-    device: str = "CPU"
+    device: str = "CPU",
+    compile_postprocess: bool = False,
 ) -> None:
 
     print(f"[ Info ] Starting YOLO model conversion: {model_name}")
@@ -256,17 +411,34 @@ def main(
     output_dir.mkdir(parents=True, exist_ok=True)
     subset_size = subset_size if subset_size is not None else samples
 
-    det_model_path, det_model = download_yolo(model_name, models_dir)
-    fp32_model = convert_yolo_to_openvino(det_model, det_model_path)
+    # Fetch the dataset first; it needs none of the heavy imports
     cfg_path = download_coco_dataset(dataset_dir, scripts_dir)
+
+    # One Core for reading and compiling; it persists compiled blobs so repeated
+    # runs skip recompiling the same models
+    core = create_core(output_dir / ".ov_cache")
+
+    det_model_path, det_model = download_yolo(model_name, models_dir)
+    fp32_model = convert_yolo_to_openvino(det_model, det_model_path, core)
     
     # Setup validator and data loader
-    validator, data_loader = setup_validator_and_dataloader(det_model, cfg_path, dataset_dir)
-    core = ov.Core()
+    validator, data_loader = setup_validator_and_dataloader(
+        det_model, cfg_path, dataset_dir, compile_postprocess=compile_postprocess
+    )
 
     # Quantize model
+    # The detect head is the last module (22 for YOLOv8, 23 for YOLO11)
+    head_idx = len(det_model.model.model) - 1
+    # The output concat's index depends on the export: static exports constant-fold the
+    # anchor concats, so take its name from the graph instead of assuming a suffix
+    head_output = fp32_model.output(0).get_node().input_value(0).get_node().get_friendly_name()
+    
+    # The PyTorch model is not needed past this point; release its weights
+    del det_model
+    gc.collect()
+    
     int8_model = quantize_yolo_model(
-        fp32_model, data_loader, validator, model_name, subset_size
+        fp32_model, data_loader, head_idx, head_output, subset_size
     )
 
     # Set model info
@@ -279,25 +451,27 @@ def main(
     print(f"\n[ Saved ] Saved FP32 model to {fp32_out}")
     print(f"[ Saved ] Saved INT8 model to {int8_out}")
 
-    # Test FP32 accuracy
-    fp32_stats = test_model_accuracy(
-        fp32_model, core, data_loader, validator, 
-        num_samples=samples, device=device
+    # Test FP32 and INT8 accuracy on one shared pass over the dataset
+    compiled_models = compile_for_accuracy(
+        {"FP32": fp32_model, "INT8": int8_model}, core, device, num_samples=samples
     )
-
-    # Test INT8 accuracy
-    int8_stats = test_model_accuracy(
-        int8_model, core, data_loader, validator, 
+    del fp32_model, int8_model
+    gc.collect()
+    results = test_model_accuracy(
+        compiled_models, data_loader, validator,
         num_samples=samples, device=device
     )
     
+    fp32_stats, fp32_validator = results["FP32"]
+    int8_stats, int8_validator = results["INT8"]
+    
     # Print results
     print("\n[Summary]")
     print("FP32 model accuracy:")
-    print_accuracy_stats(fp32_stats, validator.seen, validator.nt_per_class.sum())
+    print_accuracy_stats(fp32_stats, fp32_validator.seen, fp32_validator.nt_per_class.sum())
     
     print("\nINT8 model accuracy:")
-    print_accuracy_stats(int8_stats, validator.seen, validator.nt_per_class.sum())
+    print_accuracy_stats(int8_stats, int8_validator.seen, int8_validator.nt_per_class.sum())
 
 
 if __name__ == "__main__":
@@ -339,6 +513,11 @@ if __name__ == "__main__":
         default="CPU",
         help="Device for inference testing (default: CPU).",
     )
+    ap.add_argument(
+        "--compile-postprocess",
+        action="store_true",
+        help="Experimental: torch.compile the NMS postprocess used during accuracy checks.",
+    )
     args = ap.parse_args()
 
     main(
@@ -348,4 +527,5 @@ if __name__ == "__main__":
         subset_size=args.subset_size,
         output_dir=args.output_dir,
         device=args.device,
+        compile_postprocess=args.compile_postprocess,
     )